@@ -1,19 +1,69 @@
+import functools
 import logging
 import os
 import sys
-from typing import TypeVar, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypeVar, Optional, Union, List
 
 import yaml
 
 from pydantic import BaseModel, Field, computed_field
 
-from src.common.god.logger import logger
+from src.common.god.kjson import json_loads, json_dumps
+from src.common.god.logger import logger, DEFAULT_FORMAT, add_queue_file_handler, get_formatter
+
+# 优先使用libyaml的C解析器，未安装libyaml时回退到纯Python实现
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _yaml_signature(file_path: str) -> list:
+    """YAML文件的(修改时间, 大小)，缓存中保存同样的值，两者完全一致才视为未修改"""
+    stat = os.stat(file_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_json_cache(cache_path: str, signature: list) -> Optional[dict]:
+    """YAML未修改时，从JSON缓存文件读取已解析的配置数据"""
+    try:
+        with open(cache_path, "rb") as f:
+            raw = f.read()
+        cache = json_loads(raw)
+    except (OSError, ValueError):
+        # 缓存不存在或已损坏，重新解析YAML
+        return None
+    # 只比较时间先后不可靠（cp -p恢复旧文件、同一时间戳精度内的修改），要求签名完全一致
+    if not isinstance(cache, dict) or cache.get("yaml") != signature:
+        return None
+    return cache.get("data")
+
+
+def _write_json_cache(cache_path: str, signature: list, data: dict) -> None:
+    """将解析后的配置数据连同YAML签名写入JSON缓存文件，先写临时文件再原子替换"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    cache = {"yaml": signature, "data": data}
+    try:
+        raw = json_dumps(cache)
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        # 缓存写入失败不影响配置加载（如目录只读、YAML中包含日期等非JSON类型）
+        logger.warning(f"写入配置缓存失败: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
 
 # 根据 Python 版本选择日志级别映射方式
 if sys.version_info >= (3, 11):
-    # Python 3.11+ 使用内置方法
+    # Python 3.11+ 使用内置方法，映射表在导入时获取一次
+    LEVEL_MAPPING = logging.getLevelNamesMapping()
+
+
+    @functools.lru_cache(maxsize=16)
     def get_level_value(level_text: str) -> int:
-        return logging.getLevelNamesMapping().get(level_text.upper(), 0)
+        return LEVEL_MAPPING.get(level_text.upper(), 0)
 else:
     # Python 3.10 及以下使用手动定义的字典
     LEVEL_MAPPING = {
@@ -26,6 +76,7 @@ else:
     }
 
 
+    @functools.lru_cache(maxsize=16)
     def get_level_value(level_text: str) -> int:
         return LEVEL_MAPPING.get(level_text.upper(), 0)
 
@@ -74,25 +125,46 @@ class BaseConfig(BaseModel):
         """
         从YAML文件加载配置
         自动返回调用类的实例，子类无需重新实现
+        解析结果缓存在同目录的<file>.cache.json中，YAML的修改时间和大小都与缓存记录一致时直接读取缓存
         """
-        with open(file_path, "r", encoding="utf-8") as f:
+        cache_path = f"{file_path}.cache.json"
+        # 解析前取签名，解析期间文件被修改时缓存签名对不上，下次会重新解析
+        signature = _yaml_signature(file_path)
+        yaml_data = _read_json_cache(cache_path, signature)
+        if yaml_data is None:
+            # 以二进制方式读取，由libyaml直接解析UTF-8字节，省去文本层解码
+            with open(file_path, "rb") as f:
+                try:
+                    yaml_data = yaml.load(f, Loader=_YAML_LOADER)
+                except yaml.YAMLError as e:
+                    raise ValueError(f"YAML解析错误: {e}")
             # 添加对空文件的处理
-            try:
-                yaml_data = yaml.safe_load(f) or {}
-            except yaml.YAMLError as e:
-                raise ValueError(f"YAML解析错误: {e}")
+            if yaml_data is None:
+                yaml_data = {}
+            _write_json_cache(cache_path, signature, yaml_data)
+
+        return cls(**yaml_data)
+
+    @classmethod
+    def load_many(cls, file_paths: List[str]) -> List[T]:
+        """
+        加载多个YAML配置文件，多个文件时在进程池中并行解析
+        返回顺序与file_paths一致
+        """
+        if len(file_paths) <= 1:
+            return [cls.load_config(file_path) for file_path in file_paths]
 
-            return cls(**yaml_data)
+        with ProcessPoolExecutor(max_workers=min(len(file_paths), os.cpu_count() or 1)) as executor:
+            return list(executor.map(cls.load_config, file_paths))
 
     def init_logger(self,
                     package: str,
-                    _format: str = '%(asctime)s - %(levelname)s - 进程%(process)d:线程%(thread)d - %(filename)s:%('
-                                   'funcName)s:%(lineno)d: %(message)s') -> None:
+                    _format: str = DEFAULT_FORMAT) -> None:
         # 创建一个logger
         logger.setLevel(self.logging.level)
 
         # 日志格式
-        formatter = logging.Formatter(fmt=_format)
+        formatter = get_formatter(_format)
 
         # Debug模式不输出日志文件
         if self.general.debug:
@@ -110,9 +182,7 @@ class BaseConfig(BaseModel):
             os.makedirs(os.path.dirname(logger_path), exist_ok=True)
 
             # 创建并设置文件handler
-            file_handler = logging.FileHandler(logger_path, encoding='utf-8')
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            add_queue_file_handler(logger_path, formatter)
 
 
 # ---------------------------
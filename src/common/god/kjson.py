@@ -0,0 +1,24 @@
+"""
+JSON序列化/反序列化
+orjson为可选依赖，未安装时使用标准库json
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(raw: bytes):
+    """从UTF-8字节（或字符串）解析JSON"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def json_dumps(data, indent: bool = False) -> bytes:
+    """序列化为UTF-8字节，不转义非ASCII字符；indent为True时缩进2格"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
@@ -8,6 +8,33 @@ from src.common.god.ksnowflake import KSnowflake
 
 metadata = MetaData()
 
+# to_serializable_dict中按列类型分派的类型码
+_PLAIN, _DATETIME, _DATE, _DECIMAL = range(4)
+_TYPE_CODES = {datetime: _DATETIME, date: _DATE, Decimal: _DECIMAL}
+
+# 按类型码索引的序列化函数
+_SERIALIZERS = (
+    lambda value: value,
+    lambda value: {"__type__": "datetime", "value": value.isoformat(sep=' ', timespec='seconds')},
+    lambda value: {"__type__": "date", "value": value.isoformat()},
+    lambda value: {"__type__": "Decimal", "value": str(value)},
+)
+
+# unserializable_from_dict中按__type__分派的反序列化函数
+_DECODERS = {
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "Decimal": Decimal,
+}
+
+
+def _column_type_code(column) -> int:
+    try:
+        return _TYPE_CODES.get(column.type.python_type, _PLAIN)
+    except NotImplementedError:
+        # 部分自定义类型没有python_type，按普通值处理
+        return _PLAIN
+
 
 @as_declarative(metadata=metadata)
 class KOrmBase(object):
@@ -20,35 +47,27 @@ class KOrmBase(object):
         self.kid = None
         self.__table__ = None
 
+    @classmethod
+    def _serialize_plan(cls) -> tuple:
+        """每个表类只遍历一次columns，缓存(列名, 类型码)元组"""
+        plan = cls.__dict__.get('__serialize_plan__')
+        if plan is None:
+            plan = tuple((column.name, _column_type_code(column)) for column in cls.__table__.columns)
+            cls.__serialize_plan__ = plan
+        return plan
+
     def to_serializable_dict(self):
         rst_dict = {}
-        # for public_key in self.__table__.columns
-        for column in self.__table__.columns:
-            key = column.name
+        for key, type_code in type(self)._serialize_plan():
             value = getattr(self, key)
-            if isinstance(value, datetime):
-                rst_dict[key] = {"__type__": "datetime", "value": value.strftime("%Y-%m-%d %H:%M:%S")}
-            elif isinstance(value, date):
-                rst_dict[key] = {"__type__": "date", "value": '{0.year:4d}-{0.month:02d}-{0.day:02d}'.format(value)}
-            elif isinstance(value, Decimal):
-                rst_dict[key] = {"__type__": "Decimal", "value": str(value)}
-            else:
-                rst_dict[key] = value
+            rst_dict[key] = value if value is None else _SERIALIZERS[type_code](value)
         return rst_dict
 
     @classmethod
     def unserializable_from_dict(cls, obj_dict):
         args = {}
         for key, value in obj_dict.items():
-            if isinstance(value, dict):
-                if value["__type__"] == "datetime":
-                    args[key] = datetime.strptime(value["value"], "%Y-%m-%d %H:%M:%S")
-                elif value["__type__"] == "date":
-                    args[key] = datetime.strptime(value["value"], "%Y-%m-%d").date()
-                elif value["__type__"] == "Decimal":
-                    args[key] = Decimal(value["value"])
-            else:
-                args[key] = value
+            args[key] = _DECODERS[value["__type__"]](value["value"]) if isinstance(value, dict) else value
 
         return cls(**args)
 
@@ -1,6 +1,11 @@
-import secrets  # 使用加密安全的随机数生成器 [[2]]
+import os  # os.urandom为加密安全的随机数来源 [[2]]
 import threading
 import time
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class KSnowflake:
@@ -13,12 +18,23 @@ class KSnowflake:
     - 12位序列号（同一毫秒内的递增序号）
     """
 
-    _CLS_EPOCH_: int = int(time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, 0)) * 1000)
+    _CLS_EPOCH_: int = int(time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, 0))) * 1000
+
+    # 每次从os.urandom读取的随机字节数，一次可生成204个machine_id
+    # 随机位池是大整数，每次右移的开销与位数成正比，池子不宜过大
+    _RAND_POOL_BYTES_: int = 256
+
+    # 已创建的实例，set_custom_epoch时同步更新各实例缓存的起始点
+    _INSTANCES_ = weakref.WeakSet()
 
     def __init__(self):
         self.sequence = 0  # 同一毫秒内的序列号
         self.last_timestamp = -1  # 上次生成ID的时间戳
         self.lock = threading.Lock()  # 线程锁保证原子操作
+        self._rand_buf = 0  # 随机位池
+        self._rand_bits = 0  # 随机位池中剩余的位数
+        self._epoch = self._CLS_EPOCH_  # 时间戳起始点缓存在实例上，生成ID时不再查找类属性
+        KSnowflake._INSTANCES_.add(self)
 
         # # 时间戳起始点（2020-01-01）
         # self.epoch = int(time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, 0)) * 1000)
@@ -26,23 +42,30 @@ class KSnowflake:
     @classmethod
     def set_custom_epoch(cls, year: int, month: int, day: int):
         """设置时间戳起始点（自定义）"""
-        cls._CLS_EPOCH_ = int(time.mktime((year, month, day, 0, 0, 0, 0, 0, 0)) * 1000)
+        cls._CLS_EPOCH_ = int(time.mktime((year, month, day, 0, 0, 0, 0, 0, 0))) * 1000
+        for instance in list(KSnowflake._INSTANCES_):
+            if isinstance(instance, cls):
+                instance._epoch = cls._CLS_EPOCH_
 
-    def _til_next_millis(self, last_timestamp):
+    @staticmethod
+    def _til_next_millis(last_timestamp):
         """等待下一毫秒"""
-        timestamp = self._get_current_timestamp()
-        while timestamp <= last_timestamp:
-            timestamp = self._get_current_timestamp()
+        # 循环内直接取时间，每次自旋少一次方法调用
+        while (timestamp := time.time_ns() // 1_000_000) <= last_timestamp:
+            pass
         return timestamp
 
     @staticmethod
     def _get_current_timestamp():
-        """获取当前时间戳（毫秒）"""
-        return int(time.time() * 1000)
+        """获取当前时间戳（毫秒），整数运算，不经过浮点转换"""
+        return time.time_ns() // 1_000_000
 
     def gen_kid(self) -> int:
         """生成唯一ID（包含随机machine_id）"""
-        with self.lock:
+        # 显式acquire/release，缩短临界区内的字节码
+        lock = self.lock
+        lock.acquire()
+        try:
             timestamp = self._get_current_timestamp()
 
             # 检测时间回拨
@@ -62,10 +85,57 @@ class KSnowflake:
             self.last_timestamp = timestamp
 
             # 动态生成随机 machine_id（0-1023，10位）
-            machine_id = secrets.randbelow(1024) << 12  # 使用加密安全的随机数 [[2]]
+            # 从缓冲的随机位池中截取10位，1024是2的幂，直接取低10位即为均匀分布，无需拒绝采样
+            if self._rand_bits < 10:
+                self._rand_buf = int.from_bytes(os.urandom(self._RAND_POOL_BYTES_), 'little')
+                self._rand_bits = self._RAND_POOL_BYTES_ * 8
+            machine_id = (self._rand_buf & 0x3FF) << 12
+            self._rand_buf >>= 10
+            self._rand_bits -= 10
 
             # 组装64位ID
-            return (timestamp - self._CLS_EPOCH_) << 22 | machine_id | self.sequence
+            return (timestamp - self._epoch) << 22 | machine_id | self.sequence
+        finally:
+            lock.release()
+
+    def gen_kids(self, n: int) -> "np.ndarray":
+        """
+        批量生成n个唯一ID，返回uint64数组
+        序列号、时间戳和machine_id在numpy中整体计算，不逐个调用gen_kid
+        每毫秒最多4096个ID，超出部分顺延到后续毫秒，返回前等待时钟追上最后一个ID的时间戳
+        """
+        # 只有批量生成用到numpy，在这里导入，单个gen_kid的调用方不必加载numpy
+        import numpy as np
+
+        if n <= 0:
+            return np.empty(0, dtype=np.uint64)
+        with self.lock:
+            timestamp = self._get_current_timestamp()
+
+            # 检测时间回拨
+            if timestamp < self.last_timestamp:
+                raise Exception(f"时钟回拨 {self.last_timestamp - timestamp} 毫秒")
+
+            # 接续同一毫秒内的序列号
+            start_sequence = self.sequence + 1 if timestamp == self.last_timestamp else 0
+
+            # 第i个ID的全局序号，高位进位到时间戳，低12位为序列号
+            steps = np.arange(start_sequence, start_sequence + n, dtype=np.uint64)
+            timestamps = np.uint64(timestamp - self._epoch) + (steps >> np.uint64(12))
+            machine_ids = np.frombuffer(os.urandom(2 * n), dtype='<u2').astype(np.uint64) & np.uint64(0x3FF)
+            kids = (timestamps << np.uint64(22)) | (machine_ids << np.uint64(12)) | (steps & np.uint64(0xFFF))
+
+            last_step = start_sequence + n - 1
+            self.last_timestamp = timestamp + (last_step >> 12)
+            self.sequence = last_step & 0xFFF
+
+            # 等待时钟追上，避免之后的gen_kid误判为时钟回拨
+            remaining = self.last_timestamp - self._get_current_timestamp()
+            if remaining > 1:
+                time.sleep((remaining - 1) / 1000)
+            if remaining > 0:
+                self._til_next_millis(self.last_timestamp - 1)
+            return kids
 
 
 # 使用示例
@@ -1,19 +1,55 @@
+import atexit
 import os
+import queue
 import sys
 import logging
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Annotated
 
 # 设置core日志
 logger = logging.getLogger(__package__)
 # logger.setLevel(logging.INFO)
 
+# 默认日志格式
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - 进程%(process)d:线程%(thread)d - %(filename)s:%(funcName)s:%(lineno)d: %(message)s'
+
+# 日志文件单个最大10MB，最多保留5个备份
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# 默认格式的Formatter在导入时创建一次，所有handler共用
+_DEFAULT_FORMATTER = logging.Formatter(fmt=DEFAULT_FORMAT)
+
+
+def get_formatter(_format: str = DEFAULT_FORMAT) -> logging.Formatter:
+    """默认格式直接返回共用的Formatter，自定义格式才新建"""
+    if _format == DEFAULT_FORMAT:
+        return _DEFAULT_FORMATTER
+    return logging.Formatter(fmt=_format)
+
+
+def add_queue_file_handler(logger_path: str, formatter: logging.Formatter) -> None:
+    """
+    为logger添加写文件的handler，写文件放到后台线程，业务线程只负责入队
+    日志文件按LOG_MAX_BYTES轮转，保留LOG_BACKUP_COUNT个备份
+    """
+    file_handler = RotatingFileHandler(logger_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                       encoding='utf-8', delay=True)
+    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    # 进程退出前把队列中剩余的日志写完
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
+
 
 def init_logger(debug: Annotated[bool, 'debug模式'],
                 package: Annotated[str, '包名'],
                 level: Annotated[int, '日志级别'] = logging.INFO,
                 logger_path: Annotated[str, '日志文件路径'] = None,
-                _format: Annotated[str, '日志格式'] = '%(asctime)s - %(levelname)s - 进程%(process)d:线程%(thread)d - %(filename)s:%(funcName)s:%(lineno)d: %(message)s') -> None:
+                _format: Annotated[str, '日志格式'] = DEFAULT_FORMAT) -> None:
     # 创建一个logger
     logger.setLevel(level)
 
@@ -23,7 +59,7 @@ def init_logger(debug: Annotated[bool, 'debug模式'],
     # formatter = logging.Formatter('%(asctime)s - %(levelname)s - 进程%(process)d:线程%(thread)d - %(module)s:%(funcName)s:%(lineno)d: %(message)s')
     # 尝试隐藏更多信息
     # formatter = logging.Formatter('%(asctime)s - %(levelname)s - 进程%(process)d:线程%(thread)d - %(message)s')
-    formatter = logging.Formatter(fmt=_format)
+    formatter = get_formatter(_format)
 
     # Debug模式不输出日志文件
     if debug:
@@ -41,17 +77,21 @@ def init_logger(debug: Annotated[bool, 'debug模式'],
         os.makedirs(os.path.dirname(logger_path), exist_ok=True)
 
         # 创建并设置文件handler
-        file_handler = logging.FileHandler(logger_path, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        add_queue_file_handler(logger_path, formatter)
 
 
 def log(func):
+    # 绑定为闭包变量，每次调用省去属性查找
+    is_enabled_for = logger.isEnabledFor
+    info = logger.info
+    func_name = func.__name__
 
     @wraps(func)
     def function_log(*args, **kwargs):
 
-        logger.info("%s(%r | %r)", func.__name__, args[1:].__str__(), kwargs.__str__())
+        # INFO未开启时不记录；开启时参数由handler格式化时才做repr
+        if is_enabled_for(logging.INFO):
+            info("%s(%r | %r)", func_name, args[1:], kwargs)
         result = func(*args, **kwargs)
 
         # 要求这里返回的都是dict
@@ -4,26 +4,114 @@
 """
 import threading
 import traceback
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Annotated
 
-from sqlalchemy import engine_from_config, text, func
+from sqlalchemy import create_engine, event, text, func, select, delete, lambda_stmt, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from src.common.god.business_exception import BusinessException
 from src.common.god.common_error import CommonError
+from src.common.god.klru_cache import KLRUCache
 from src.common.god.logger import logger
 
 
+# 查询语句使用lambda_stmt构建，SQLAlchemy按语句结构缓存编译结果，参数值以绑定参数传入
+def _where_equal(column, value):
+    if value is None:
+        # 与filter_by保持一致，None生成IS NULL
+        return lambda s: s.where(column.is_(None))
+    return lambda s: s.where(column == value)
+
+
+def _filter_by(stmt, cls, condition: dict):
+    """在lambda语句上追加等价于filter_by(**condition)的条件"""
+    for key, value in condition.items():
+        stmt += _where_equal(getattr(cls, key), value)
+    return stmt
+
+
+def _select_by_condition(cls, condition: dict):
+    """等价于query(cls).filter_by(**condition)的lambda语句"""
+    return _filter_by(lambda_stmt(lambda: select(cls)), cls, condition)
+
+
+# 按kid查询单条记录的语句，每个表类构建一次，之后只替换绑定参数
+_STMT_CACHE: dict = {}
+
+
+def _select_by_kid(cls):
+    stmt = _STMT_CACHE.get(cls)
+    if stmt is None:
+        stmt = select(cls).where(cls.kid == bindparam('kid')).limit(1)
+        _STMT_CACHE[cls] = stmt
+    return stmt
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    每个新建的连接上设置SQLite参数
+    WAL模式下读写可以并发，synchronous=NORMAL时提交不再每次fsync
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.execute('PRAGMA cache_size=-65536')
+    finally:
+        cursor.close()
+
+
 class SqliteDB(object):
+    # 连接池配置
+    POOL_SIZE = 8
+    MAX_OVERFLOW = 8
+    POOL_RECYCLE = 3600
+    # 编译语句缓存条数，gets_by_condition等按不同条件组合会生成较多语句
+    QUERY_CACHE_SIZE = 1200
+
+    # 数据库文件路径 -> engine，同一数据库在进程内共享一个连接池，重复打开项目时不再新建
+    _ENGINES_: dict = {}
 
     def __init__(self, db_path: Path):
         self.db_path = None
         self.db_engine = None
         self.db_session = None
-        self.sessions = dict()
+        # 每个线程的session存放在线程本地槽位中，取值无需按线程id查字典
+        self.sessions = threading.local()
+        # (表名, kid) -> id 的进程内缓存，命中后通过session.get走identity map
+        self._kid_cache = KLRUCache(maxsize=4096)
         self._load_db(db_path)
 
+    @classmethod
+    def get_engine(cls, db_path: Path):
+        """获取数据库对应的engine，首次使用时创建"""
+        key = str(db_path)
+        db_engine = cls._ENGINES_.get(key)
+        if db_engine is None:
+            # SQLAlchemy
+            # 多线程网络模型中session生命周期 https://docs.sqlalchemy.org/en/14/orm/contextual.html#thread-local-scope
+            # commit后会清空session所有的绑定对象, 如果需要继续使用model, 需要session.refresh(user)或者配置expire_on_commit=False
+            # 显式指定连接池参数，pool_pre_ping在取出连接时检测失效连接
+            db_engine = create_engine(f"sqlite:///{key}",
+                                      echo=False,
+                                      poolclass=QueuePool,
+                                      pool_size=cls.POOL_SIZE,
+                                      max_overflow=cls.MAX_OVERFLOW,
+                                      pool_recycle=cls.POOL_RECYCLE,
+                                      pool_pre_ping=True,
+                                      query_cache_size=cls.QUERY_CACHE_SIZE,
+                                      # 连接池中的连接会被不同线程取用
+                                      connect_args={'check_same_thread': False})
+            event.listen(db_engine, 'connect', _set_sqlite_pragmas)
+            cls._ENGINES_[key] = db_engine
+        return db_engine
+
     def _load_db(self, db_path: Path):
         try:
             self.db_path = db_path
@@ -31,15 +119,7 @@ class SqliteDB(object):
                 self.db_path.touch()
                 logger.info(f'创建数据库文件: {db_path}')
 
-            # SQLAlchemy
-            # 多线程网络模型中session生命周期 https://docs.sqlalchemy.org/en/14/orm/contextual.html#thread-local-scope
-            # commit后会清空session所有的绑定对象, 如果需要继续使用model, 需要session.refresh(user)或者配置expire_on_commit=False
-            db_config = {
-                "sqlalchemy.url": f"sqlite:///{str(db_path)}",
-                "sqlalchemy.echo": False,
-                "sqlalchemy.pool_pre_ping": True,
-            }
-            self.db_engine = engine_from_config(db_config, prefix="sqlalchemy.")
+            self.db_engine = self.get_engine(db_path)
             # 创建 Session 类
             self.db_session = scoped_session(sessionmaker(bind=self.db_engine, expire_on_commit=False))
         except (NameError, ModuleNotFoundError) as e:
@@ -48,29 +128,37 @@ class SqliteDB(object):
             raise
 
     def thread_session(self) -> scoped_session | None:
-        # threading.local()每次都会重新生成新的变量
-        session = self.sessions.get(threading.get_ident())
+        session = getattr(self.sessions, 'session', None)
         if session is None:
-            self.sessions[threading.get_ident()] = self.db_session()
-            session = self.sessions.get(threading.get_ident())
+            self.sessions.session = self.db_session()
             logger.error('没有合适的线程安全session')
             logger.error(''.join(traceback.format_stack(limit=10)))
             raise BusinessException(CommonError.SESSION_ERROR)
         return session
 
-    @staticmethod
-    def close_session(self):
-        session = self.sessions.get(threading.get_ident())
-        session.close()
-        pass
+    def close_session(self) -> None:
+        """
+        关闭当前线程的session，当前线程没有session时不做处理
+        关闭后的session仍保留在线程槽位中，之后thread_session取到它可以继续使用
+        """
+        session = getattr(self.sessions, 'session', None)
+        if session is not None:
+            session.close()
 
     def get_by_id(self, cls, _id):
-        session = self.thread_session()
         if _id is None:
             return None
-        if isinstance(_id, tuple):
-            _id, = _id
-        return session.query(cls).filter_by(id=_id).first()
+        assert not isinstance(_id, tuple), '批量查询请使用get_many_by_ids'
+        session = self.thread_session()
+        # 按主键查询，identity map中已有对象时不发出SQL
+        return session.get(cls, _id)
+
+    def get_many_by_ids(self, cls, ids: list) -> list:
+        """按主键批量查询，不排序"""
+        if not ids:
+            return []
+        session = self.thread_session()
+        return session.execute(lambda_stmt(lambda: select(cls).where(cls.id.in_(ids)))).scalars().all()
 
     def get_by_kid(self, cls, kid):
         """
@@ -80,73 +168,121 @@ class SqliteDB(object):
         """
         if kid is None:
             return None
-        if isinstance(kid, tuple):
-            kid, = kid
+        assert not isinstance(kid, tuple), '批量查询请使用gets_in_kids'
         session = self.thread_session()
-        obj = session.query(cls).filter_by(kid=kid).first()
+        cache_key = (cls.__tablename__, kid)
+        _id = self._kid_cache.get(cache_key)
+        if _id is not None:
+            obj = session.get(cls, _id)
+            if obj is not None and obj.kid == kid:
+                return obj
+            # 缓存的记录已被删除或kid已变化
+            self._kid_cache.pop(cache_key)
+        obj = session.execute(_select_by_kid(cls), {'kid': kid}).scalars().first()
+        if obj is not None:
+            self._kid_cache.put(cache_key, obj.id)
         return obj
 
+    def _evict_kid(self, obj) -> None:
+        """对象写入或删除后，使kid缓存失效"""
+        kid = getattr(obj, 'kid', None)
+        if kid is not None:
+            self._kid_cache.pop((obj.__tablename__, kid))
+
     def get_by_condition(self, cls, with_for_update: bool = False, order_by: str = None, **condition):
-        session = self.thread_session()
         if condition is None:
             return None
         if not isinstance(condition, dict):
             return None
+        session = self.thread_session()
         _order_by = text(order_by) if order_by else text('id desc')
-        return session.query(cls).filter_by(**condition).order_by(_order_by).first() if not with_for_update else \
-            session.query(cls).with_for_update().filter_by(**condition).order_by(_order_by).first()
+        stmt = _select_by_condition(cls, condition) + (lambda s: s.order_by(_order_by).limit(1))
+        if with_for_update:
+            stmt += lambda s: s.with_for_update()
+        return session.execute(stmt).scalars().first()
 
     def gets_by_condition(self, cls, page: int, size: int, order_by: str = None, **condition) -> (list, int):
-        session = self.thread_session()
         if condition is None:
             return None
         if not isinstance(condition, dict):
             return None
+        session = self.thread_session()
         _order_by = text(order_by) if order_by else text('id desc')
-        return session.query(cls).filter_by(**condition).order_by(_order_by).offset((page - 1) * size).limit(
-            size).all(), \
-            session.query(func.count(cls.id)).filter_by(**condition).scalar()
+        offset = (page - 1) * size
+        stmt = _filter_by(lambda_stmt(lambda: select(cls, func.count().over())), cls, condition)
+        stmt += lambda s: s.order_by(_order_by).offset(offset).limit(size)
+        count_stmt = _filter_by(lambda_stmt(lambda: select(func.count(cls.id))), cls, condition)
+        return self._page_with_total(session, stmt, count_stmt, page)
 
     def gets_in_ids(self, cls, ids: list, order_by: str = None) -> list | None:
-        session = self.thread_session()
         if ids is None:
             return None
+        session = self.thread_session()
         _order_by = text(order_by) if order_by else text('id desc')
-        return session.query(cls).filter(cls.id.in_(ids)).order_by(_order_by).all()
+        return session.execute(
+            lambda_stmt(lambda: select(cls).where(cls.id.in_(ids)).order_by(_order_by))).scalars().all()
 
     def gets_in_kids(self, cls, kids: list, order_by: str = None) -> list | None:
-        session = self.thread_session()
         if kids is None:
             return None
+        session = self.thread_session()
         _order_by = text(order_by) if order_by else text('id desc')
-        return session.query(cls).filter(cls.kid.in_(kids)).order_by(_order_by).all()
+        return session.execute(
+            lambda_stmt(lambda: select(cls).where(cls.kid.in_(kids)).order_by(_order_by))).scalars().all()
 
     def gets_by_filters(self, cls, filters: tuple, page: int, size: int, order_by: str = None) -> (list, int):
-        session = self.thread_session()
         if filters is None:
             return None
+        session = self.thread_session()
         _order_by = text(order_by) if order_by else text('id desc')
-        return session.query(cls).filter(*filters).order_by(_order_by).offset((page - 1) * size).limit(size).all(), \
-            session.query(func.count(cls.id)).filter(*filters).scalar()
+        offset = (page - 1) * size
+        stmt = lambda_stmt(
+            lambda: select(cls, func.count().over()).where(*filters).order_by(_order_by).offset(offset).limit(size))
+        count_stmt = lambda_stmt(lambda: select(func.count(cls.id)).where(*filters))
+        return self._page_with_total(session, stmt, count_stmt, page)
+
+    @staticmethod
+    def _page_with_total(session, stmt, count_stmt, page: int) -> (list, int):
+        """
+        分页查询，总数通过COUNT(*) OVER()随每行返回，一次查询同时取得当前页和总数
+        只有当前页为空且不是第一页时（页码超出范围），才单独查询总数
+        """
+        rows = session.execute(stmt).all()
+        if rows:
+            return [row[0] for row in rows], rows[0][1]
+        if page <= 1:
+            return [], 0
+        return [], session.execute(count_stmt).scalar()
 
     def get_sums(self, cls, fields: list, filters: tuple) -> list | None:
-        session = self.thread_session()
         if filters is None:
             return None
+        session = self.thread_session()
         # return db.query(*[func.sum(x) for x in fields if (x.key in cls.__dict__)]).filter(*filters).all()
-        return session.query(*[func.sum(x) for x in fields]).filter(*filters).all()
+        sums = [func.sum(x) for x in fields]
+        return session.execute(lambda_stmt(lambda: select(*sums).where(*filters))).all()
 
     def delete_by_kid(self, cls, kid: Annotated[str | int, '唯一kid'],
                       with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
         if not kid:
             raise BusinessException(error=CommonError.PARAMETER_ERROR)
-        instance = self.get_by_kid(cls, kid=kid)
-        self.delete(instance, with_commit=with_commit)
+        session = self.thread_session()
+        try:
+            # 直接执行DELETE ... WHERE kid=:kid，不需要先查询出对象
+            session.execute(delete(cls).where(cls.kid == kid))
+            self._kid_cache.pop((cls.__tablename__, kid))
+            if with_commit:
+                session.commit()
+        except Exception as e:
+            logger.error(e)
+            session.rollback()
+            raise e
 
     def save(self, obj, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
         session = self.thread_session()
         try:
             obj.remove_kid_if_none()
+            self._evict_kid(obj)
             session.merge(obj)
             if with_commit:
                 # 事务提交
@@ -158,6 +294,17 @@ class SqliteDB(object):
             session.rollback()
             raise e
 
+    def save_many(self, objs: list, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
+        """
+        批量保存对象，所有对象在同一个事务中merge，只提交一次
+        :param objs: 继承自KOrmBase的对象列表
+        :param with_commit: 是否提交事务
+        """
+        with self.batch(with_commit=with_commit) as session:
+            for obj in objs:
+                self._evict_kid(obj)
+                session.merge(obj)
+
     def add(self, obj, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
         session = self.thread_session()
         try:
@@ -172,10 +319,67 @@ class SqliteDB(object):
             session.rollback()
             raise e
 
+    def add_many(self, cls, objs: list, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
+        """
+        批量插入新对象，编译一条INSERT语句后通过executemany提交，不经过identity map
+        插入后不会回填objs的id，需要id时使用save_many
+        :param cls: 继承自KOrmBase的类
+        :param objs: cls的对象列表
+        :param with_commit: 是否提交事务
+        """
+        if not objs:
+            return
+        names = [column.name for column in cls.__table__.columns]
+        # 值为None的列不写入，由数据库默认值或自增主键填充
+        mappings = [{name: value for name in names if (value := getattr(obj, name, None)) is not None}
+                    for obj in objs]
+        with self.batch(with_commit=with_commit) as session:
+            session.bulk_insert_mappings(cls, mappings)
+
+    def upsert_many(self, cls, objs: list, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
+        """
+        按kid批量插入或更新，一条INSERT ... ON CONFLICT(kid) DO UPDATE语句通过executemany提交
+        不需要先查询对象是否存在，kid为None的对象先生成kid
+        :param cls: 继承自KOrmBase且有kid列的类
+        :param objs: cls的对象列表
+        :param with_commit: 是否提交事务
+        """
+        if not objs:
+            return
+        columns = cls.__table__.columns
+        # 自增id和时间字段由数据库维护
+        names = [column.name for column in columns if column.name not in ('id', 'create_time', 'update_time')]
+        mappings = []
+        for obj in objs:
+            if obj.kid is None:
+                obj.kid = cls.gen_kid()
+            mappings.append({name: getattr(obj, name, None) for name in names})
+
+        stmt = sqlite_insert(cls)
+        set_ = {name: stmt.excluded[name] for name in names if name != 'kid'}
+        if 'update_time' in columns:
+            # ON CONFLICT DO UPDATE不会触发列上的onupdate，需要显式更新
+            set_['update_time'] = func.current_timestamp()
+        stmt = stmt.on_conflict_do_update(index_elements=[cls.kid], set_=set_)
+        with self.batch(with_commit=with_commit) as session:
+            session.execute(stmt, mappings)
+            for obj in objs:
+                self._evict_kid(obj)
+
+    def delete_by_kids(self, cls, kids: list, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
+        """按kid批量删除，一条DELETE ... WHERE kid IN (...)语句，不需要先查询出对象"""
+        if not kids:
+            return
+        with self.batch(with_commit=with_commit) as session:
+            session.execute(delete(cls).where(cls.kid.in_(kids)))
+            for kid in kids:
+                self._kid_cache.pop((cls.__tablename__, kid))
+
     def delete(self, obj, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
         session = self.thread_session()
         try:
             obj.remove_kid_if_none()
+            self._evict_kid(obj)
             session.delete(obj)
             if with_commit:
                 session.commit()
@@ -186,6 +390,35 @@ class SqliteDB(object):
             session.rollback()
             raise e
 
+    def delete_many(self, objs: list, with_commit: Annotated[bool, '是否提交事务'] = True) -> None:
+        """
+        批量删除对象，所有对象在同一个事务中删除，只提交一次
+        :param objs: 继承自KOrmBase的对象列表
+        :param with_commit: 是否提交事务
+        """
+        with self.batch(with_commit=with_commit) as session:
+            for obj in objs:
+                self._evict_kid(obj)
+                session.delete(obj)
+
+    @contextmanager
+    def batch(self, with_commit: Annotated[bool, '是否提交事务'] = True):
+        """
+        批量写操作上下文，块内复用同一个线程session，结束时统一提交，出错回滚
+        with sqlite_db.batch() as session:
+            for obj in objs:
+                session.add(obj)
+        """
+        session = self.thread_session()
+        try:
+            yield session
+            if with_commit:
+                session.commit()
+        except Exception as e:
+            logger.error(e)
+            session.rollback()
+            raise e
+
     def execute_in_transaction(self, transaction_func, *args, **kwargs):
         """
         在事务中执行函数
@@ -1,9 +1,33 @@
 import base64
+import binascii
+import functools
+import itertools
 import logging
+import math
+import weakref
+from collections import defaultdict
 from pathlib import Path
 from typing import Optional
 
-from PIL import Image  # 用于获取图像尺寸
+import numpy as np
+
+from src.common.god.klru_cache import KLRUCache
+
+# 已加载的YOLO模型，key为(模型文件绝对路径, 修改时间)
+# 切换项目时如果使用同一个权重文件，直接复用已加载的模型；没有执行器引用时自动释放
+_yolo_model_pool = weakref.WeakValueDictionary()
+
+# 检测结果行格式：base64类别名称 x_center y_center width height
+_DETECTION_LINE_FORMAT = "%s %.9f %.9f %.9f %.9f"
+
+
+@functools.lru_cache(maxsize=1024)
+def _read_image_size(img_path: str, mtime_ns: int) -> tuple:
+    """用PIL读取图像尺寸 (width, height)，按(路径, 修改时间)缓存，文件修改后自动重新读取"""
+    # 延迟导入，ultralytics提供orig_shape时不需要加载PIL
+    from PIL import Image
+    with Image.open(img_path) as img:
+        return img.size
 
 
 class YOLOExecutor:
@@ -11,10 +35,15 @@ class YOLOExecutor:
     
     yolo_model_path_key = "yolo_model_path"  # 类属性，固定值为"yolo_model_path"
 
-    def __init__(self):
+    def __init__(self, half: bool = True):
+        self.half = half  # 是否使用FP16推理，仅在GPU上生效，CPU推理时ultralytics会自动忽略
         self.yolo_model = None  # 存储加载好的YOLO模型
         self.model_name = None  # 存储模型名称
         self.yolo_model_path: Optional[Path] = None  # 实例属性，存储加载的模型路径
+        self._pool_key: Optional[tuple] = None  # 当前模型在_yolo_model_pool中的key
+        self._class_name_b64: dict = {}  # 类别ID -> base64编码的类别名称，模型加载后固定不变
+        # (图像路径, 修改时间, 文件大小, 模型, half) -> 检测结果，重复识别未修改的图像时不再推理
+        self._detection_cache = KLRUCache(maxsize=256)
 
     def is_model_loaded(self) -> bool:
         """
@@ -25,6 +54,16 @@ class YOLOExecutor:
         """
         return self.yolo_model is not None and self.yolo_model_path is not None and self.yolo_model_path.exists()
 
+    def is_loaded_from(self, model_path: Path) -> bool:
+        """判断当前已加载的模型是否就是model_path，且权重文件加载后未被修改"""
+        if self.yolo_model is None or self.yolo_model_path != model_path:
+            return False
+        try:
+            weights_path = self._resolve_weights(model_path)
+            return self._pool_key == (str(weights_path.resolve()), weights_path.stat().st_mtime_ns)
+        except OSError:
+            return False
+
     def load_yolo(self, model_path: Path):
         """
         加载YOLO模型
@@ -45,8 +84,18 @@ class YOLOExecutor:
                 logging.error(error_msg)
                 raise FileNotFoundError(error_msg)
 
-            # 加载模型
-            self.yolo_model = YOLO(str(model_path))
+            # 加载模型，同一权重文件已加载过时直接复用
+            weights_path = self._resolve_weights(model_path)
+            pool_key = (str(weights_path.resolve()), weights_path.stat().st_mtime_ns)
+            yolo_model = _yolo_model_pool.get(pool_key)
+            if yolo_model is None:
+                yolo_model = YOLO(str(weights_path))
+                logging.info(f"Loaded YOLO weights: {weights_path.name}")
+                _yolo_model_pool[pool_key] = yolo_model
+            self.yolo_model = yolo_model
+            self._pool_key = pool_key
+            self._class_name_b64 = {class_id: base64.b64encode(class_name.encode('utf-8')).decode('utf-8')
+                                    for class_id, class_name in self.yolo_model.names.items()}
             self.model_name = model_path.name
             self.yolo_model_path = model_path  # 保存模型路径
             logging.info(f"Loaded YOLO model: {self.model_name}")
@@ -63,10 +112,31 @@ class YOLOExecutor:
             self.clear_model()
             raise Exception(error_msg) from e
 
+    @staticmethod
+    def _resolve_weights(model_path: Path) -> Path:
+        """
+        确定实际加载的权重文件
+        .pt模型同目录下有同名的TensorRT引擎（yolo export format=engine生成的.engine文件），
+        且引擎不比.pt旧、CUDA可用时，加载引擎推理；否则加载原模型文件
+        批量推理需要以dynamic=True导出引擎
+        """
+        engine_path = model_path.with_suffix('.engine')
+        if model_path.suffix != '.pt' or not engine_path.exists():
+            return model_path
+        if engine_path.stat().st_mtime_ns < model_path.stat().st_mtime_ns:
+            # 引擎早于权重文件，可能已过期
+            return model_path
+
+        import torch
+        return engine_path if torch.cuda.is_available() else model_path
+
     def clear_model(self):
         self.yolo_model = None  # 存储加载好的YOLO模型
         self.model_name = None  # 存储模型名称
         self.yolo_model_path = None  # 实例属性，存储加载的模型路径
+        self._pool_key = None
+        self._class_name_b64 = {}
+        self._detection_cache.clear()
 
     def process_detection_results(self, results, img_width, img_height) -> list:
         """
@@ -78,57 +148,132 @@ class YOLOExecutor:
         返回:
             格式化的检测结果列表
         """
-        import base64
         detection_results = []
         for result in results:
-            for box in result.boxes:
-                # 获取类别ID和置信度
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-
-                # 获取类别名称并进行base64编码
-                class_name = self.yolo_model.names[class_id]
-                class_name_b64 = base64.b64encode(class_name.encode('utf-8')).decode('utf-8')
-
-                # 获取边界框坐标并转换为归一化坐标
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                x_center = (x1 + x2) / 2 / img_width
-                y_center = (y1 + y2) / 2 / img_height
-                width = (x2 - x1) / img_width
-                height = (y2 - y1) / img_height
-
-                # 添加到结果列表
-                detection_results.append(
-                    f"{class_name_b64} {x_center:.9f} {y_center:.9f} {width:.9f} {height:.9f}"
-                )
+            detection_results.extend(self._process_result(result, img_width, img_height))
         return detection_results
 
-    def exec_yolo(self, img_path: Path):
-        """使用yolo识别目标，从.kolo文件读取现有数据，合并结果"""
-        # 保留原有参数检查逻辑
+    def _process_result(self, result, img_width, img_height) -> list:
+        """处理单张图像的检测结果，格式同process_detection_results"""
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return []
+
+        # 一次性把所有框从设备拷贝为numpy数组，按float64计算，与逐个tolist()的结果一致
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+        class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+
+        # 批量转换为归一化坐标
+        x1, y1, x2, y2 = xyxy[:, 0], xyxy[:, 1], xyxy[:, 2], xyxy[:, 3]
+        x_centers = ((x1 + x2) / 2 / img_width).tolist()
+        y_centers = ((y1 + y2) / 2 / img_height).tolist()
+        widths = ((x2 - x1) / img_width).tolist()
+        heights = ((y2 - y1) / img_height).tolist()
+
+        # 类别名称的base64编码在加载模型时已预先计算
+        class_names_b64 = [self._class_name_b64[class_id] for class_id in class_ids]
+
+        # 每个框一次%格式化生成一行
+        return [_DETECTION_LINE_FORMAT % row
+                for row in zip(class_names_b64, x_centers, y_centers, widths, heights)]
+
+    def _check_model_loaded(self):
         if not self.is_model_loaded():
             error_msg = "No YOLO model loaded! Please load a model first."
             raise Exception(error_msg)
 
+    @staticmethod
+    def _check_image_exists(img_path: Path):
         if not img_path.exists():
             error_msg = f"Image file not found: {str(img_path)}"
             raise FileNotFoundError(error_msg)
 
+    @staticmethod
+    def _get_image_size(img_path: Path) -> tuple:
+        """读取图像尺寸 (width, height)"""
+        YOLOExecutor._check_image_exists(img_path)
+
         # 自动获取图像尺寸
         try:
-            with Image.open(img_path) as img:
-                img_width, img_height = img.size
+            img_width, img_height = _read_image_size(str(img_path), img_path.stat().st_mtime_ns)
             logging.debug(f"获取图像尺寸: {img_width}x{img_height}")
         except Exception as e:
             logging.error(f"获取图像尺寸失败: {str(e)}")
             raise
+        return img_width, img_height
+
+    def _get_result_size(self, result, img_path: Path) -> tuple:
+        """
+        获取检测结果对应的图像尺寸 (width, height)
+        ultralytics在result.orig_shape中给出解码后的原图尺寸 (height, width)，有则直接使用，不再用PIL读取
+        """
+        orig_shape = getattr(result, 'orig_shape', None)
+        if orig_shape is not None and len(orig_shape) >= 2:
+            return orig_shape[1], orig_shape[0]
+        return self._get_image_size(img_path)
+
+    def _detection_key(self, img_path: Path) -> tuple:
+        """检测结果缓存的key，图像文件或模型变化后key随之变化"""
+        stat = img_path.stat()
+        return str(img_path), stat.st_mtime_ns, stat.st_size, self._pool_key, self.half
+
+    def exec_yolo(self, img_path: Path):
+        """使用yolo识别目标，从.kolo文件读取现有数据，合并结果"""
+        # 保留原有参数检查逻辑
+        self._check_model_loaded()
+        self._check_image_exists(img_path)
+
+        # 执行检测并处理结果，同一图像和模型的检测结果直接复用
+        key = self._detection_key(img_path)
+        detection_results = self._detection_cache.get(key)
+        if detection_results is None:
+            results = self.yolo_model(str(img_path), half=self.half)
+            if len(results) > 0:
+                img_width, img_height = self._get_result_size(results[0], img_path)
+                detection_results = tuple(self.process_detection_results(results, img_width, img_height))
+            else:
+                detection_results = ()
+            self._detection_cache.put(key, detection_results)
+        # .kolo文件可能已被修改，每次都重新合并
+        return self._merge_with_kolo(img_path, list(detection_results))
+
+    def exec_yolo_batch(self, img_paths: list, batch_size: int = 16) -> dict:
+        """
+        批量识别多张图像，每batch_size张图像一起送入模型推理
+        每张图像的结果与exec_yolo相同（已合并同名.kolo文件）
+
+        返回:
+            {图像路径: 合并后的检测结果列表}，顺序与img_paths一致
+        """
+        self._check_model_loaded()
+
+        merged_results = {}
+        for start in range(0, len(img_paths), batch_size):
+            chunk = img_paths[start:start + batch_size]
+            cached_results = {}
+            for img_path in chunk:
+                self._check_image_exists(img_path)
+                key = self._detection_key(img_path)
+                cached_results[img_path] = (key, self._detection_cache.get(key))
+
+            # 只对没有缓存结果的图像推理，stream=True逐张返回结果，顺序与输入一致
+            pending = [img_path for img_path in chunk if cached_results[img_path][1] is None]
+            if pending:
+                results = self.yolo_model([str(img_path) for img_path in pending], stream=True, batch=batch_size,
+                                          half=self.half)
+                for img_path, result in zip(pending, results):
+                    img_width, img_height = self._get_result_size(result, img_path)
+                    key = cached_results[img_path][0]
+                    detection_results = tuple(self._process_result(result, img_width, img_height))
+                    self._detection_cache.put(key, detection_results)
+                    cached_results[img_path] = (key, detection_results)
+
+            for img_path in chunk:
+                merged_results[img_path] = self._merge_with_kolo(img_path, list(cached_results[img_path][1]))
+        return merged_results
 
-        # 执行检测并处理结果
-        detection_results = self.process_detection_results(
-            self.yolo_model(str(img_path)),
-            img_width,
-            img_height
-        )
+    def _merge_with_kolo(self, img_path: Path, detection_results: list) -> list:
+        """读取同名.kolo文件中的已有标注，与检测结果合并"""
         logging.debug(f"YOLO检测到 {len(detection_results)} 个目标")
 
         # 读取同名.kolo文件并合并符合格式的内容
@@ -200,10 +345,6 @@ class YOLOExecutor:
         返回:
             合并后的检测结果列表
         """
-        import base64
-        from collections import defaultdict
-        import binascii  # 直接导入binascii模块
-
         print(f'传入：{len(detection_results)}')
 
         # 解析检测结果并按类别分组
@@ -241,26 +382,46 @@ class YOLOExecutor:
 
             # 用于记录已保留的条目
             kept = []
+            # 已保留条目按中心点所在网格分桶，网格边长为threshold
+            # 中心点相差小于threshold的两个条目，所在网格在x、y方向上最多相差1格，只需比较相邻9格
+            grid = defaultdict(list)
+            # 坐标为inf/nan或过大时无法计算网格，这类条目不分桶，与之相关的比较退回逐个比较
+            unbucketed = []
             for item in items:
                 xc, yc, w, h, original_str = item
-                is_similar = False
-
-                # 与已保留的条目比较
-                for kept_item in kept:
-                    kept_xc, kept_yc, kept_w, kept_h, _ = kept_item
-                    # 检查四个坐标是否都在阈值范围内
-                    if (abs(xc - kept_xc) < threshold and
-                            abs(yc - kept_yc) < threshold and
-                            abs(w - kept_w) < threshold and
-                            abs(h - kept_h) < threshold):
-                        is_similar = True
-                        break
+                if threshold <= 0:
+                    # 阈值非正时任何条目都不相近
+                    kept.append(item)
+                    continue
+                cell_x = xc / threshold
+                cell_y = yc / threshold
+                if math.isfinite(cell_x) and math.isfinite(cell_y):
+                    cell = (math.floor(cell_x), math.floor(cell_y))
+                    # 与相邻网格中以及未分桶的已保留条目比较
+                    candidates = itertools.chain(
+                        *[grid.get((cell[0] + dx, cell[1] + dy), ()) for dx in (-1, 0, 1) for dy in (-1, 0, 1)],
+                        unbucketed)
+                else:
+                    cell = None
+                    # 与所有已保留的条目比较
+                    candidates = kept
+
+                # 检查四个坐标是否都在阈值范围内
+                is_similar = any(abs(xc - kept_xc) < threshold and
+                                 abs(yc - kept_yc) < threshold and
+                                 abs(w - kept_w) < threshold and
+                                 abs(h - kept_h) < threshold
+                                 for kept_xc, kept_yc, kept_w, kept_h, _ in candidates)
 
                 # 如果相似，打印日志
                 if is_similar:
                     print(f'相似：{item}')
                 else:
                     kept.append(item)
+                    if cell is None:
+                        unbucketed.append(item)
+                    else:
+                        grid[cell].append(item)
 
             # 将保留的条目按原始顺序添加到结果（取原始字符串）
             merged.extend([item[4] for item in kept])
@@ -1,4 +1,5 @@
-import hashlib
+import zlib
+from typing import Optional
 
 from PyQt5.QtGui import QColor
 
@@ -9,10 +10,14 @@ class AnnotationCategory:
     class_name: str
     color: QColor
 
-    def __init__(self, class_id: int, class_name: str):
+    # class_name -> 生成的颜色，颜色只由类别名称决定，无需失效
+    _color_cache: dict = {}
+
+    def __init__(self, class_id: int, class_name: str, color: Optional[QColor] = None):
         self.class_id = class_id
         self.class_name = class_name
-        self.color = self.gen_color()
+        # 已有颜色（如从数据库加载）时直接使用，不再生成
+        self.color = color if color is not None else self.gen_color()
 
     @staticmethod
     def merge_and_regenerate_color(cat1, cat2):
@@ -27,7 +32,12 @@ class AnnotationCategory:
         return None
 
     def gen_color(self) -> QColor:
-        return self._generate_color_from_md5()
+        cached = AnnotationCategory._color_cache.get(self.class_name)
+        if cached is None:
+            cached = self._generate_color_from_hash()
+            AnnotationCategory._color_cache[self.class_name] = cached
+        # 返回副本，避免多个类别共享同一个QColor对象
+        return QColor(cached)
 
     def _generate_color_from_id(self):
         """根据类别ID生成稳定颜色"""
@@ -35,18 +45,16 @@ class AnnotationCategory:
         hue = (self.class_id * 137) % 360  # 使用黄金角确保颜色分布均匀
         return QColor.fromHsv(hue, 180, 230)  # 高饱和度，中等亮度
 
-    def _generate_color_from_md5(self):
-        """根据类别名称生成稳定颜色（使用MD5后6位），避免接近白色"""
-        # 1. 计算class_name的MD5哈希
-        md5_hash = hashlib.md5(self.class_name.encode()).hexdigest()
-
-        # 2. 取MD5哈希值的后6位作为颜色代码
-        color_hex = md5_hash[-6:]
+    def _generate_color_from_hash(self):
+        """根据类别名称生成稳定颜色（使用CRC32低24位），避免接近白色"""
+        # 1. 计算class_name的CRC32，只需要稳定的24位，不需要MD5这样的密码学哈希
+        name_hash = zlib.crc32(self.class_name.encode())
 
+        # 2. 取哈希值的低24位作为颜色代码
         # 3. 转换为RGB值
-        r = int(color_hex[0:2], 16)
-        g = int(color_hex[2:4], 16)
-        b = int(color_hex[4:6], 16)
+        r = (name_hash >> 16) & 0xFF
+        g = (name_hash >> 8) & 0xFF
+        b = name_hash & 0xFF
 
         # 4. 关键优化：避免接近白色
         # 计算当前颜色与白色的欧氏距离
@@ -1,12 +1,10 @@
-import json
 from pathlib import Path
 from typing import Optional, List
 
 from PyQt5.QtGui import QColor
+from sqlalchemy import delete, insert, select
 
 from src.common.god.sqlite_db import SqliteDB
-from src.core.ksettings import KSettings
-from src.core.yolo_executor import YOLOExecutor
 from src.models.dto.annotation_category import AnnotationCategory
 from src.models.sql import gen_sql_tables
 from src.models.sql.annotation_category import AnnotationCategory as SQLAnnotationCategory
@@ -19,13 +17,47 @@ class RefProjectInfo:
 
     def __init__(self, path: Path):
         self.path = path  # 可变属性
-        self.yolo_executor = YOLOExecutor()
-        self.categories: list[AnnotationCategory] = []
+        self._yolo_executor = None  # 首次使用模型时才创建YOLOExecutor
+        self._categories: list[AnnotationCategory] = []
+        # 类别名称/ID -> 类别的索引，categories被替换或原地修改后由rebuild_category_index重建
+        self._by_name: dict[str, AnnotationCategory] = {}
+        self._by_id: dict[int, AnnotationCategory] = {}
+        self._config_dir_checked: Optional[Path] = None  # 已确认存在的配置目录
 
         # 初始化数据库
         gen_sql_tables(self.db_path)
         self.sqlite_db: Optional[SqliteDB] = SqliteDB(self.db_path)
 
+    @property
+    def yolo_executor(self):
+        if self._yolo_executor is None:
+            # 延迟导入，打开项目时不加载numpy/PIL等推理相关模块
+            from src.core.yolo_executor import YOLOExecutor
+            self._yolo_executor = YOLOExecutor()
+        return self._yolo_executor
+
+    @property
+    def categories(self) -> list[AnnotationCategory]:
+        return self._categories
+
+    @categories.setter
+    def categories(self, categories: list[AnnotationCategory]):
+        self._categories = categories
+        self.rebuild_category_index()
+
+    def rebuild_category_index(self):
+        """
+        重建名称/ID索引，对categories做增删、排序或修改类别名称/ID后必须调用
+        名称或ID重复时保留列表中靠前的类别，与线性查找一致
+        """
+        by_name = {}
+        by_id = {}
+        for category in self._categories:
+            by_name.setdefault(category.class_name, category)
+            by_id.setdefault(category.class_id, category)
+        self._by_name = by_name
+        self._by_id = by_id
+
     def exists(self) -> bool:
         if self.path is None:
             return False
@@ -33,9 +65,10 @@ class RefProjectInfo:
 
     @property
     def db_path(self):
-        if self._config_dir is None:
+        config_dir = self._config_dir
+        if config_dir is None:
             return None
-        return self._config_dir / 'data.db'
+        return config_dir / 'data.db'
 
     @property
     def project_name(self) -> str:
@@ -45,16 +78,16 @@ class RefProjectInfo:
 
     @property
     def model_name(self) -> str:
-        if not self.yolo_executor.is_model_loaded:
+        if self._yolo_executor is None or not self.yolo_executor.is_model_loaded:
             return ''
         return self.yolo_executor.model_name
 
-    @property
-    def _yolo_model_key(self):
-        return f"yolo_model_path"
+    _yolo_model_key = "yolo_model_path"
 
     @property
     def is_model_loaded(self):
+        if self._yolo_executor is None:
+            return False
         return self.yolo_executor.is_model_loaded()
 
     @property
@@ -80,6 +113,10 @@ class RefProjectInfo:
                 finally:
                     session.close()
 
+            # 同一模型已加载且文件未修改时，无需重新加载和写数据库
+            if self._yolo_executor is not None and self._yolo_executor.is_loaded_from(model_path):
+                return True
+
             # 尝试加载模型
             self.yolo_executor.load_yolo(model_path)
             is_loaded = self.yolo_executor.is_model_loaded()
@@ -139,16 +176,35 @@ class RefProjectInfo:
 
     def exec_yolo(self, img_path: Path):
         results = self.yolo_executor.exec_yolo(img_path)
+        self._write_kolo(img_path, results)
+        return results
+
+    def exec_yolo_batch(self, img_paths: List[Path], batch_size: int = 16) -> dict:
+        """批量识别多张图片，推理全部完成后逐个写入.kolo文件"""
+        results_by_path = self.yolo_executor.exec_yolo_batch(img_paths, batch_size=batch_size)
+        for img_path, results in results_by_path.items():
+            self._write_kolo(img_path, results)
+        return results_by_path
+
+    @staticmethod
+    def _write_kolo(img_path: Path, results: list):
         # 生成与图片同名的.kolo文件路径
         kolo_path = img_path.with_suffix('.kolo')
 
         try:
-            # 写入检测结果到.kolo文件
-            with open(kolo_path, 'w', encoding='utf-8') as f:
-                for result in results:
-                    # 确保结果是字符串格式（根据实际结果类型调整）
-                    line = str(result) if isinstance(result, (list, tuple)) else result
-                    f.write(f"{line}\n")
+            # 确保结果是字符串格式（根据实际结果类型调整）
+            lines = [str(result) if isinstance(result, (list, tuple)) else result for result in results]
+            content = ''.join(f"{line}\n" for line in lines)
+
+            # 内容与已有文件相同时不再重写
+            try:
+                if kolo_path.read_text(encoding='utf-8') == content:
+                    return
+            except (FileNotFoundError, UnicodeDecodeError):
+                pass
+
+            # 拼接后一次性写入.kolo文件
+            kolo_path.write_text(content, encoding='utf-8')
 
             # 记录成功日志
             print(f"检测结果已成功保存到.kolo文件: {kolo_path}")
@@ -159,8 +215,6 @@ class RefProjectInfo:
             print(error_msg)
             raise Exception(error_msg)
 
-        return results
-
     @property
     def _config_dir(self):
         if self.path is None:
@@ -168,9 +222,10 @@ class RefProjectInfo:
         # 如果存在同名的.kboxlabel文件夹，则使用它，如果不存在，则创建，然后返回路径
         _config_dir = self.path / '.kboxlabel'
 
-        # 检查目录是否存在，如果不存在则创建
-        if not _config_dir.exists():
+        # 检查目录是否存在，如果不存在则创建；同一路径只检查一次，不再每次访问都stat
+        if self._config_dir_checked != _config_dir:
             _config_dir.mkdir(parents=True, exist_ok=True)
+            self._config_dir_checked = _config_dir
 
         return _config_dir
 
@@ -185,17 +240,18 @@ class RefProjectInfo:
         session = self.sqlite_db.db_session()
         try:
             # 清除现有的所有类别
-            session.query(SQLAnnotationCategory).delete()
-
-            # 添加所有当前类别
-            for category in self.categories:
-                sql_category = SQLAnnotationCategory()
-                sql_category.class_id = category.class_id
-                sql_category.class_name = category.class_name
-                sql_category.color_r = category.color.red()
-                sql_category.color_g = category.color.green()
-                sql_category.color_b = category.color.blue()
-                session.add(sql_category)
+            session.execute(delete(SQLAnnotationCategory))
+
+            # 添加所有当前类别，直接以字典列表executemany插入，不创建ORM对象
+            rows = [{
+                'class_id': category.class_id,
+                'class_name': category.class_name,
+                'color_r': category.color.red(),
+                'color_g': category.color.green(),
+                'color_b': category.color.blue(),
+            } for category in self.categories]
+            if rows:
+                session.execute(insert(SQLAnnotationCategory), rows)
 
             # 提交事务
             session.commit()
@@ -216,34 +272,28 @@ class RefProjectInfo:
         # 开始会话
         session = self.sqlite_db.db_session()
         try:
-            # 查询所有类别
-            sql_categories = session.query(SQLAnnotationCategory).all()
-
-            # 转换为AnnotationCategory对象列表
-            categories = []
-            for sql_cat in sql_categories:
-                category = AnnotationCategory(
-                    class_id=sql_cat.class_id,
-                    class_name=sql_cat.class_name
-                )
-                category.color = QColor(sql_cat.color_r, sql_cat.color_g, sql_cat.color_b)
-                categories.append(category)
-
-            return categories
+            # 只查询需要的列，返回元组行，不构造ORM对象
+            rows = session.execute(select(
+                SQLAnnotationCategory.class_id,
+                SQLAnnotationCategory.class_name,
+                SQLAnnotationCategory.color_r,
+                SQLAnnotationCategory.color_g,
+                SQLAnnotationCategory.color_b,
+            )).all()
+
+            # 转换为AnnotationCategory对象列表，颜色使用数据库中保存的值
+            return [
+                AnnotationCategory(class_id=class_id, class_name=class_name, color=QColor(r, g, b))
+                for class_id, class_name, r, g, b in rows
+            ]
         finally:
             session.close()
 
     def find_annotation_by_name(self, name: str) -> Optional[AnnotationCategory]:
         """根据类别名称查找标注类别"""
-        for category in self.categories:
-            if category.class_name == name:
-                return category
-        return None  # 未找到时返回None
+        return self._by_name.get(name)  # 未找到时返回None
 
     def find_annotation_by_id(self, class_id: int) -> Optional[AnnotationCategory]:
         """根据类别ID查找标注类别"""
         # 注意：原方法定义的参数名有误，已更正为class_id（原参数名name不合理）
-        for category in self.categories:
-            if category.class_id == class_id:
-                return category
-        return None  # 未找到时返回None
+        return self._by_id.get(class_id)  # 未找到时返回None
@@ -1,8 +1,8 @@
 from pathlib import Path
 
-from sqlalchemy import engine_from_config
-
+from src.common.god.korm_base import KOrmBase
 from src.common.god.logger import logger
+from src.common.god.sqlite_db import SqliteDB
 from src.models.sql.annotation_category import AnnotationCategory
 from src.models.sql.kolo_item import KoloItem
 from src.models.sql.kv_config import KVConfig
@@ -21,21 +21,16 @@ def gen_sql_tables(db_path: Path):
             db_path.touch()
             logger.info(f'创建数据库文件: {db_path}')
 
-        # SQLAlchemy配置
-        # 多线程网络模型中session生命周期 https://docs.sqlalchemy.org/en/14/orm/contextual.html#thread-local-scope
-        # commit后会清空session所有的绑定对象, 如果需要继续使用model, 需要session.refresh(user)或者配置expire_on_commit=False
-        db_config = {
-            "sqlalchemy.url": f"sqlite:///{str(db_path)}",
-            "sqlalchemy.echo": False,
-            "sqlalchemy.pool_pre_ping": True,
-        }
-        db_engine = engine_from_config(db_config, prefix="sqlalchemy.")
+        # 与SqliteDB共用同一个engine，建表时打开的连接留在连接池中供之后的会话使用
+        db_engine = SqliteDB.get_engine(db_path)
 
         # 检查并创建表和索引。添加新的类型后，要在这里添加新表
-        # 使用checkfirst=True确保只有在表不存在时才创建
-        AnnotationCategory.metadata.create_all(db_engine, checkfirst=True)  # type: ignore
-        KoloItem.metadata.create_all(db_engine, checkfirst=True)  # type: ignore
-        KVConfig.metadata.create_all(db_engine, checkfirst=True)  # type: ignore
+        # 使用checkfirst=True确保只有在表不存在时才创建，所有表共用一份metadata，一次检查和创建
+        KOrmBase.metadata.create_all(db_engine, checkfirst=True, tables=[
+            AnnotationCategory.__table__,
+            KoloItem.__table__,
+            KVConfig.__table__,
+        ])  # type: ignore
 
     except (NameError, ModuleNotFoundError) as e:
         logger.error(e)
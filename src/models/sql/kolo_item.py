@@ -1,4 +1,4 @@
-from sqlalchemy import Column, INTEGER, String, DateTime, text, Numeric, func, Index
+from sqlalchemy import Column, INTEGER, String, DateTime, text, Float, func, Index
 
 from src.common.god.korm_base import KOrmBase
 
@@ -16,11 +16,11 @@ class KoloItem(KOrmBase):
     image_name = Column(String(255), nullable=False, comment='名称')
     class_name = Column(String(64), nullable=False, comment='名称')
 
-    # 4个浮点类型的Column，精确到小数点后19位
-    x_center = Column(Numeric(precision=30, scale=19), comment='中心点X坐标')
-    y_center = Column(Numeric(precision=30, scale=19), comment='中心点Y坐标')
-    width = Column(Numeric(precision=30, scale=19), comment='宽度')
-    height = Column(Numeric(precision=30, scale=19), comment='高度')
+    # 4个浮点类型的Column，对应SQLite的REAL（8字节双精度），读取时不再转换为Decimal
+    x_center = Column(Float, comment='中心点X坐标')
+    y_center = Column(Float, comment='中心点Y坐标')
+    width = Column(Float, comment='宽度')
+    height = Column(Float, comment='高度')
 
     create_time = Column(DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP"), comment='创建时间')
     update_time = Column(DateTime,
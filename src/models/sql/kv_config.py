@@ -1,4 +1,4 @@
-from sqlalchemy import Column, INTEGER, String, DateTime, text, Numeric, func, Index
+from sqlalchemy import Column, INTEGER, String, DateTime, text, func, Index
 
 from src.common.god.korm_base import KOrmBase
 
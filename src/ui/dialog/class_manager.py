@@ -1,61 +1,277 @@
 import os
 import random
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QListView, QStyledItemDelegate, QStyle,
     QPushButton, QColorDialog, QLineEdit, QLabel, QInputDialog,
     QMessageBox, QAbstractItemView, QWidget, QSizePolicy
 )
 from PyQt5.QtGui import QColor, QIcon, QFont, QPixmap, QPainter
-from PyQt5.QtCore import Qt, pyqtSignal, QSize
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QAbstractListModel, QModelIndex
+
+# 对话框各控件的样式表，定义一次，每次打开对话框时直接引用
+_TITLE_QSS = "font-size: 16px; font-weight: bold; color: #E1E1E1;"
+
+_LIST_QSS = """
+    QListView {
+        background-color: #252526;
+        border: 1px solid #3F3F46;
+        border-radius: 4px;
+        padding: 5px;
+    }
+    QListView::item {
+        height: 40px;
+    }
+    QListView::item:selected {
+        background-color: #2A2D2E;
+    }
+"""
+
+_ADD_BTN_QSS = """
+    QPushButton {
+        background-color: #0078D7;
+        color: white;
+        padding: 8px 12px;
+        border-radius: 4px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #106EBE;
+    }
+    QPushButton:pressed {
+        background-color: #005A9E;
+    }
+"""
+
+_EDIT_COLOR_BTN_QSS = """
+    QPushButton {
+        background-color: #68217A;
+        color: white;
+        padding: 8px 12px;
+        border-radius: 4px;
+    }
+    QPushButton:hover {
+        background-color: #7A3D8C;
+    }
+    QPushButton:disabled {
+        background-color: #3F3F46;
+        color: #888;
+    }
+"""
+
+_DELETE_BTN_QSS = """
+    QPushButton {
+        background-color: #A12622;
+        color: white;
+        padding: 8px 12px;
+        border-radius: 4px;
+    }
+    QPushButton:hover {
+        background-color: #C13530;
+    }
+    QPushButton:disabled {
+        background-color: #3F3F46;
+        color: #888;
+    }
+"""
+
+_OK_BTN_QSS = """
+    QPushButton {
+        background-color: #0078D7;
+        color: white;
+        padding: 8px 16px;
+        border-radius: 4px;
+        font-weight: bold;
+        min-width: 80px;
+    }
+    QPushButton:hover {
+        background-color: #106EBE;
+    }
+"""
+
+_CANCEL_BTN_QSS = """
+    QPushButton {
+        background-color: #5C5C5C;
+        color: white;
+        padding: 8px 16px;
+        border-radius: 4px;
+        min-width: 80px;
+    }
+    QPushButton:hover {
+        background-color: #4A4A4A;
+    }
+"""
+
+
+# 预设的一组美观的颜色，类别颜色只会被整体替换，不会原地修改，可以共用
+_PRESET_COLORS = tuple(QColor(hex_color) for hex_color in (
+    "#FF5252", "#FF4081", "#E040FB",
+    "#7C4DFF", "#536DFE", "#448AFF",
+    "#40C4FF", "#18FFFF", "#64FFDA",
+    "#69F0AE", "#B2FF59", "#EEFF41",
+    "#FFFF00", "#FFD740", "#FFAB40",
+    "#FF6E40",
+))
+
+# 按钮图标颜色
+_ADD_ICON_COLOR = QColor("#0078D7")
+_EDIT_COLOR_ICON_COLOR = QColor("#BA68C8")
+
+# (颜色, 尺寸) -> 颜色图标，QPixmap需要在QApplication创建后才能使用，首次使用时生成
+_ICON_CACHE: dict = {}
+
+# 类别颜色的数据角色
+ColorRole = Qt.UserRole + 1
+
+
+class ClassListModel(QAbstractListModel):
+    """类别列表模型，每行保存(类别名称, 颜色)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.colors = []
+
+    def set_classes(self, classes):
+        """整体替换类别列表，classes为(名称, 颜色)序列"""
+        self.beginResetModel()
+        self.names = [name for name, _ in classes]
+        self.colors = [color for _, color in classes]
+        self.endResetModel()
+
+    def append_class(self, name, color):
+        row = len(self.names)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.names.append(name)
+        self.colors.append(color)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.names):
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.names[index.row()]
+        if role == ColorRole:
+            return self.colors[index.row()]
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        if role == Qt.EditRole:
+            self.names[index.row()] = value
+        elif role == ColorRole:
+            self.colors[index.row()] = value
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            # 允许拖放到列表空白处
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if count <= 0 or row < 0 or row + count > len(self.names):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        del self.names[row:row + count]
+        del self.colors[row:row + count]
+        self.endRemoveRows()
+        return True
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        """拖动排序，QListView内部移动时调用"""
+        if count <= 0 or source_row < 0 or source_row + count > len(self.names):
+            return False
+        if source_row <= destination_child <= source_row + count:
+            # 移动到原位置
+            return False
+        if not self.beginMoveRows(source_parent, source_row, source_row + count - 1,
+                                  destination_parent, destination_child):
+            return False
+        names = self.names[source_row:source_row + count]
+        colors = self.colors[source_row:source_row + count]
+        del self.names[source_row:source_row + count]
+        del self.colors[source_row:source_row + count]
+        insert_row = destination_child - count if destination_child > source_row else destination_child
+        self.names[insert_row:insert_row] = names
+        self.colors[insert_row:insert_row] = colors
+        self.endMoveRows()
+        return True
+
+
+class ClassItemDelegate(QStyledItemDelegate):
+    """绘制类别行：左侧圆形色块，右侧类别名称；编辑时才创建输入框"""
+
+    ROW_HEIGHT = 40
+    SWATCH_SIZE = 20
+    SELECTED_BACKGROUND = QColor("#2A2D2E")
+    TEXT_COLOR = QColor("white")
+
+    # 名称输入框样式
+    _LINEEDIT_QSS = """
+        QLineEdit {
+            border: 1px solid #3F3F46;
+            border-radius: 4px;
+            padding: 4px;
+            background-color: #2D2D30;
+            color: white;
+        }
+        QLineEdit:focus {
+            border: 1px solid #0078D7;
+        }
+    """
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
 
+        # 选中状态背景
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, self.SELECTED_BACKGROUND)
 
-class ClassItemWidget(QWidget):
-    """自定义类别项组件"""
+        # 圆形色块
+        rect = option.rect
+        swatch_top = rect.y() + (rect.height() - self.SWATCH_SIZE) // 2
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(index.data(ColorRole))
+        painter.drawEllipse(rect.x() + 5, swatch_top, self.SWATCH_SIZE, self.SWATCH_SIZE)
 
-    def __init__(self, name, color, parent=None):
-        super().__init__(parent)
-        self.name = name
-        self.color = color
-
-        # 创建布局
-        layout = QHBoxLayout()
-        layout.setContentsMargins(5, 2, 5, 2)
-        layout.setSpacing(10)
-
-        # 颜色标签
-        self.color_label = QLabel()
-        self.color_label.setFixedSize(20, 20)
-        self.color_label.setStyleSheet(f"background-color: {color.project_name()}; border-radius: 10px;")
-
-        # 名称输入框
-        self.name_edit = QLineEdit(name)
-        self.name_edit.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #3F3F46;
-                border-radius: 4px;
-                padding: 4px;
-                background-color: #2D2D30;
-                color: white;
-            }
-            QLineEdit:focus {
-                border: 1px solid #0078D7;
-            }
-        """)
-        self.name_edit.setMinimumWidth(150)
-
-        # 添加组件到布局
-        layout.addWidget(self.color_label)
-        layout.addWidget(self.name_edit)
-        layout.addStretch()
-
-        self.setLayout(layout)
-
-    def update_color(self, new_color):
-        """更新颜色显示"""
-        self.color = new_color
-        self.color_label.setStyleSheet(
-            f"background-color: {new_color.project_name()}; border-radius: 10px;"
-        )
+        # 类别名称
+        painter.setPen(self.TEXT_COLOR)
+        text_rect = rect.adjusted(5 + self.SWATCH_SIZE + 10, 0, -5, 0)
+        text = painter.fontMetrics().elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, text)
+
+        painter.restore()
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setStyleSheet(self._LINEEDIT_QSS)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        # 输入框放在色块右侧
+        editor.setGeometry(option.rect.adjusted(5 + self.SWATCH_SIZE + 10, 4, -5, -4))
 
 
 class ClassManagerDialog(QDialog):
@@ -66,6 +282,7 @@ class ClassManagerDialog(QDialog):
         super().__init__(parent)
         self.dataset_manager = dataset_manager
         self.classes = dataset_manager.classes.copy()  # 复制类别列表
+        self._class_set = set(self.classes)  # 与self.classes同步，用于判断类别是否已存在
         self.colors = self.load_class_colors()  # 加载类别颜色
 
         self.setWindowTitle("类别管理器")
@@ -83,7 +300,7 @@ class ClassManagerDialog(QDialog):
 
         # 标题标签
         title_label = QLabel("管理标注类别")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #E1E1E1;")
+        title_label.setStyleSheet(_TITLE_QSS)
         main_layout.addWidget(title_label)
 
         # 类别列表区域
@@ -91,24 +308,21 @@ class ClassManagerDialog(QDialog):
         list_layout = QVBoxLayout(list_group)
         list_layout.setContentsMargins(0, 0, 0, 0)
 
-        # 类别列表
-        self.class_list = QListWidget()
+        # 类别列表，每行由委托绘制，不再为每个类别创建控件
+        self.class_model = ClassListModel(self)
+        self.class_list = QListView()
+        self.class_list.setModel(self.class_model)
+        self.class_list.setItemDelegate(ClassItemDelegate(self.class_list))
+        # 所有行高度相同，只按第一行计算尺寸；类别很多时分批布局
+        self.class_list.setUniformItemSizes(True)
+        self.class_list.setLayoutMode(QListView.Batched)
+        self.class_list.setBatchSize(50)
         self.class_list.setSelectionMode(QAbstractItemView.SingleSelection)
         self.class_list.setDragDropMode(QAbstractItemView.InternalMove)
-        self.class_list.setStyleSheet("""
-            QListWidget {
-                background-color: #252526;
-                border: 1px solid #3F3F46;
-                border-radius: 4px;
-                padding: 5px;
-            }
-            QListWidget::item {
-                height: 40px;
-            }
-            QListWidget::item:selected {
-                background-color: #2A2D2E;
-            }
-        """)
+        self.class_list.setDefaultDropAction(Qt.MoveAction)
+        self.class_list.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed |
+                                        QAbstractItemView.SelectedClicked)
+        self.class_list.setStyleSheet(_LIST_QSS)
 
         list_layout.addWidget(self.class_list)
         main_layout.addWidget(list_group)
@@ -119,96 +333,31 @@ class ClassManagerDialog(QDialog):
 
         # 添加按钮
         self.add_button = QPushButton("添加类别")
-        self.add_button.setIcon(self.create_color_icon(QColor("#0078D7")))
-        self.add_button.setStyleSheet("""
-            QPushButton {
-                background-color: #0078D7;
-                color: white;
-                padding: 8px 12px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #106EBE;
-            }
-            QPushButton:pressed {
-                background-color: #005A9E;
-            }
-        """)
+        self.add_button.setIcon(self.create_color_icon(_ADD_ICON_COLOR))
+        self.add_button.setStyleSheet(_ADD_BTN_QSS)
         self.add_button.clicked.connect(self.add_class)
 
         # 编辑颜色按钮
         self.edit_color_button = QPushButton("编辑颜色")
-        self.edit_color_button.setIcon(self.create_color_icon(QColor("#BA68C8")))
-        self.edit_color_button.setStyleSheet("""
-            QPushButton {
-                background-color: #68217A;
-                color: white;
-                padding: 8px 12px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #7A3D8C;
-            }
-            QPushButton:disabled {
-                background-color: #3F3F46;
-                color: #888;
-            }
-        """)
+        self.edit_color_button.setIcon(self.create_color_icon(_EDIT_COLOR_ICON_COLOR))
+        self.edit_color_button.setStyleSheet(_EDIT_COLOR_BTN_QSS)
         self.edit_color_button.setEnabled(False)
         self.edit_color_button.clicked.connect(self.edit_class_color)
 
         # 删除按钮
         self.delete_button = QPushButton("删除")
         self.delete_button.setIcon(QIcon(":/icons/delete.png"))
-        self.delete_button.setStyleSheet("""
-            QPushButton {
-                background-color: #A12622;
-                color: white;
-                padding: 8px 12px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #C13530;
-            }
-            QPushButton:disabled {
-                background-color: #3F3F46;
-                color: #888;
-            }
-        """)
+        self.delete_button.setStyleSheet(_DELETE_BTN_QSS)
         self.delete_button.setEnabled(False)
         self.delete_button.clicked.connect(self.delete_class)
 
         # 确定/取消按钮
         self.ok_button = QPushButton("确定")
-        self.ok_button.setStyleSheet("""
-            QPushButton {
-                background-color: #0078D7;
-                color: white;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-weight: bold;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background-color: #106EBE;
-            }
-        """)
+        self.ok_button.setStyleSheet(_OK_BTN_QSS)
         self.ok_button.clicked.connect(self.save_classes)
 
         self.cancel_button = QPushButton("取消")
-        self.cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #5C5C5C;
-                color: white;
-                padding: 8px 16px;
-                border-radius: 4px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background-color: #4A4A4A;
-            }
-        """)
+        self.cancel_button.setStyleSheet(_CANCEL_BTN_QSS)
         self.cancel_button.clicked.connect(self.reject)
 
         # 添加操作按钮
@@ -225,10 +374,16 @@ class ClassManagerDialog(QDialog):
         self.setLayout(main_layout)
 
         # 连接列表选择变化信号
-        self.class_list.itemSelectionChanged.connect(self.update_button_state)
+        self.class_list.selectionModel().selectionChanged.connect(self.update_button_state)
 
-    def create_color_icon(self, color, size=16):
+    @staticmethod
+    def create_color_icon(color, size=16):
         """创建颜色图标"""
+        key = (color.rgba(), size)
+        icon = _ICON_CACHE.get(key)
+        if icon is not None:
+            return icon
+
         pixmap = QPixmap(size, size)
         pixmap.fill(Qt.transparent)
 
@@ -238,26 +393,18 @@ class ClassManagerDialog(QDialog):
         painter.drawEllipse(0, 0, size - 1, size - 1)
         painter.end()
 
-        return QIcon(pixmap)
+        icon = QIcon(pixmap)
+        _ICON_CACHE[key] = icon
+        return icon
 
     def load_class_colors(self):
         """加载类别颜色，如果不存在则生成随机颜色"""
         colors = {}
 
-        # 预设一组美观的颜色
-        preset_colors = [
-            QColor("#FF5252"), QColor("#FF4081"), QColor("#E040FB"),
-            QColor("#7C4DFF"), QColor("#536DFE"), QColor("#448AFF"),
-            QColor("#40C4FF"), QColor("#18FFFF"), QColor("#64FFDA"),
-            QColor("#69F0AE"), QColor("#B2FF59"), QColor("#EEFF41"),
-            QColor("#FFFF00"), QColor("#FFD740"), QColor("#FFAB40"),
-            QColor("#FF6E40")
-        ]
-
         # 为每个类别分配颜色
         for i, class_name in enumerate(self.classes):
-            if i < len(preset_colors):
-                colors[class_name] = preset_colors[i]
+            if i < len(_PRESET_COLORS):
+                colors[class_name] = _PRESET_COLORS[i]
             else:
                 # 生成随机但鲜艳的颜色
                 hue = random.randint(0, 359)
@@ -267,20 +414,8 @@ class ClassManagerDialog(QDialog):
 
     def load_classes(self):
         """加载类别到列表"""
-        self.class_list.clear()
-
-        for class_name in self.classes:
-            color = self.colors.get(class_name, QColor("#0078D7"))
-            self.add_class_item(class_name, color)
-
-    def add_class_item(self, name, color):
-        """添加类别项到列表"""
-        item = QListWidgetItem(self.class_list)
-        widget = ClassItemWidget(name, color)
-        item.setSizeHint(widget.sizeHint())
-        self.class_list.addItem(item)
-        self.class_list.setItemWidget(item, widget)
-        return item
+        self.class_model.set_classes([(class_name, self.colors.get(class_name, QColor("#0078D7")))
+                                      for class_name in self.classes])
 
     def add_class(self):
         """添加新类别"""
@@ -289,7 +424,7 @@ class ClassManagerDialog(QDialog):
         )
 
         if ok and new_name:
-            if new_name in self.classes:
+            if new_name in self._class_set:
                 QMessageBox.warning(
                     self, "重复类别",
                     f"类别 '{new_name}' 已存在，请使用不同的名称！"
@@ -302,35 +437,33 @@ class ClassManagerDialog(QDialog):
 
             # 添加到列表
             self.classes.append(new_name)
+            self._class_set.add(new_name)
             self.colors[new_name] = new_color
-            self.add_class_item(new_name, new_color)
+            self.class_model.append_class(new_name, new_color)
 
     def edit_class_color(self):
         """编辑当前选中类别的颜色"""
-        selected_items = self.class_list.selectedItems()
-        if not selected_items:
+        if not self.class_list.selectionModel().hasSelection():
             return
 
-        item = selected_items[0]
-        widget = self.class_list.itemWidget(item)
-
+        # 单选模式下，选中项即当前项
+        index = self.class_list.currentIndex()
         color = QColorDialog.getColor(
-            widget.color, self, "选择类别颜色"
+            index.data(ColorRole), self, "选择类别颜色"
         )
 
         if color.isValid():
-            widget.update_color(color)
-            self.colors[widget.name_edit.text()] = color
+            self.class_model.setData(index, color, ColorRole)
+            self.colors[index.data(Qt.DisplayRole)] = color
 
     def delete_class(self):
         """删除选中的类别"""
-        selected_items = self.class_list.selectedItems()
-        if not selected_items:
+        if not self.class_list.selectionModel().hasSelection():
             return
 
-        item = selected_items[0]
-        widget = self.class_list.itemWidget(item)
-        class_name = widget.name_edit.text()
+        # 单选模式下，选中项即当前项
+        index = self.class_list.currentIndex()
+        class_name = index.data(Qt.DisplayRole)
 
         # 确认对话框
         reply = QMessageBox.question(
@@ -340,14 +473,19 @@ class ClassManagerDialog(QDialog):
         )
 
         if reply == QMessageBox.Yes:
-            row = self.class_list.row(item)
-            self.class_list.takeItem(row)
-            self.classes.remove(class_name)
+            row = index.row()
+            self.class_model.removeRows(row, 1)
+            # 行号通常与self.classes下标一致，直接按下标删除；拖动排序或改名后不一致时再按名称查找
+            if row < len(self.classes) and self.classes[row] == class_name:
+                self.classes.pop(row)
+            else:
+                self.classes.remove(class_name)
+            self._class_set.discard(class_name)
             del self.colors[class_name]
 
     def update_button_state(self):
         """更新按钮状态（根据选择项）"""
-        has_selection = len(self.class_list.selectedItems()) > 0
+        has_selection = self.class_list.selectionModel().hasSelection()
         self.edit_color_button.setEnabled(has_selection)
         self.delete_button.setEnabled(has_selection)
 
@@ -355,20 +493,18 @@ class ClassManagerDialog(QDialog):
         """保存类别设置"""
         # 更新类别名称（允许在列表中直接编辑）
         updated_classes = []
+        seen_names = set()
         updated_colors = {}
 
-        for i in range(self.class_list.count()):
-            item = self.class_list.item(i)
-            widget = self.class_list.itemWidget(item)
-
-            new_name = widget.name_edit.text().strip()
+        for row in range(self.class_model.rowCount()):
+            new_name = self.class_model.names[row].strip()
             if not new_name:
                 QMessageBox.warning(
                     self, "无效名称", "类别名称不能为空！"
                 )
                 return
 
-            if new_name in updated_classes:
+            if new_name in seen_names:
                 QMessageBox.warning(
                     self, "重复类别",
                     f"类别 '{new_name}' 已存在，请使用不同的名称！"
@@ -376,7 +512,8 @@ class ClassManagerDialog(QDialog):
                 return
 
             updated_classes.append(new_name)
-            updated_colors[new_name] = widget.color
+            seen_names.add(new_name)
+            updated_colors[new_name] = self.class_model.colors[row]
 
         # 更新数据集管理器
         self.dataset_manager.classes = updated_classes
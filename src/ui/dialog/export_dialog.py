@@ -5,6 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 
+# 上次选择的导出目录，默认为用户主目录；再次打开对话框时从这里开始浏览
+_last_export_dir = os.path.expanduser("~")
+
 
 class ExportDialog(QDialog):
     # 自定义信号
@@ -110,15 +113,17 @@ class ExportDialog(QDialog):
 
     def browse_export_path(self):
         """打开文件对话框选择导出路径"""
+        global _last_export_dir
         # 使用QFileDialog选择目录[7](@ref)
         path = QFileDialog.getExistingDirectory(
             self,
             "选择导出目录",
-            os.path.expanduser("~"),
+            _last_export_dir,
             QFileDialog.ShowDirsOnly | QFileDialog.DontResolveSymlinks
         )
 
         if path:
+            _last_export_dir = path
             self.export_path = path
             self.path_edit.setText(path)
             self.export_button.setEnabled(True)  # 启用导出按钮
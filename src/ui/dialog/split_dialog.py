@@ -97,8 +97,10 @@ class SplitDialog(QDialog):
 
     def get_split_ratios(self):
         """获取划分比例"""
+        train_percent = self.train_spin.value()
+        val_percent = self.val_spin.value()
         return {
-            "train": self.train_spin.value() / 100.0,
-            "val": self.val_spin.value() / 100.0,
-            "test": (100 - self.train_spin.value() - self.val_spin.value()) / 100.0
+            "train": train_percent / 100.0,
+            "val": val_percent / 100.0,
+            "test": (100 - train_percent - val_percent) / 100.0
         }
@@ -1,5 +1,4 @@
 # main_window.py
-import json
 import os
 from pathlib import Path
 from typing import cast
@@ -10,12 +9,18 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                              QPushButton, QInputDialog, QFileDialog, QDialogButtonBox,
                              )  # 新增导入
 
+from src.common.god.kjson import json_dumps
 from src.models.dto.ref_project_info import RefProjectInfo
 from src.ui.widget.image_canvas.image_canvas import ImageCanvas
 from src.ui.widget.image_list import ImageListView
 from src.ui.widget.main_menu_bar import MainMenuBar
 
 
+def _write_json(json_path: Path, data: dict) -> None:
+    """以缩进2格、不转义非ASCII字符的格式写出JSON文件，一次写入"""
+    Path(json_path).write_bytes(json_dumps(data, indent=True))
+
+
 class MainWindow(QMainWindow):
 
     def __init__(self, project_path: Path):
@@ -438,7 +443,6 @@ class MainWindow(QMainWindow):
         """
         from PyQt5.QtWidgets import QProgressDialog, QMessageBox, QFileDialog
         from PyQt5.QtCore import Qt
-        import json
         from datetime import datetime
 
         # 检查项目路径是否存在
@@ -591,8 +595,7 @@ class MainWindow(QMainWindow):
         # 保存COCO格式的JSON文件
         coco_json_path = output_path / "annotations.json"
         try:
-            with open(coco_json_path, 'w', encoding='utf-8') as f:
-                json.dump(coco_data, f, indent=2, ensure_ascii=False)
+            _write_json(coco_json_path, coco_data)
         except Exception as e:
             QMessageBox.warning(self, "导出失败", f"保存COCO文件时出错: {str(e)}")
             return
@@ -698,8 +701,7 @@ class MainWindow(QMainWindow):
                 annotation_id += 1
 
             # 写入COCO格式的JSON文件
-            with open(json_path, 'w', encoding='utf-8') as json_file:
-                json.dump(coco_data, json_file, indent=2, ensure_ascii=False)
+            _write_json(json_path, coco_data)
 
             print(f"成功导出COCO格式文件: {json_path}")
 
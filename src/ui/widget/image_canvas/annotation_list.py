@@ -459,6 +459,9 @@ class AnnotationList(QListView):
                     # 更新模型中的颜色数据
                     self.source_model.setData(source_index, self.project_info.categories[row].color, Qt.UserRole)
 
+        # 类别名称/ID可能已修改，重建查找索引
+        self.project_info.rebuild_category_index()
+
     def get_selected_category(self):
         """获取当前选中的完整类别对象"""
         selected = self.selectionModel().selectedIndexes()
@@ -503,6 +506,7 @@ class AnnotationList(QListView):
         else:
             self.project_info.categories.append(new_category)
             self.source_model.add_annotation(new_category)
+        self.project_info.rebuild_category_index()
 
         # 获取新添加项的索引
         if position is not None:
@@ -548,6 +552,7 @@ class AnnotationList(QListView):
             if 0 <= row < len(self.project_info.categories):
                 # 从数据源中删除
                 del self.project_info.categories[row]
+                self.project_info.rebuild_category_index()
                 # 从模型中删除
                 self.source_model.removeRow(row)
                 # 保存更改
@@ -559,6 +564,7 @@ class AnnotationList(QListView):
             return
         # 按名称升序排序
         self.project_info.categories.sort(key=lambda x: x.class_name)
+        self.project_info.rebuild_category_index()
         # 更新模型
         self.source_model.update_from_categories(self.project_info.categories)
         # 保存排序结果
@@ -570,6 +576,7 @@ class AnnotationList(QListView):
             return
         # 按ID升序排序
         self.project_info.categories.sort(key=lambda x: x.class_id)
+        self.project_info.rebuild_category_index()
         # 更新模型
         self.source_model.update_from_categories(self.project_info.categories)
         # 保存排序结果
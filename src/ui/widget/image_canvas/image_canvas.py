@@ -4,7 +4,7 @@ import sys
 from pathlib import Path
 from typing import Optional
 
-from PyQt5.QtCore import Qt, QRectF, QPointF, QEvent, QSize, pyqtSignal
+from PyQt5.QtCore import Qt, QRectF, QPointF, QEvent, QSize, pyqtSignal, QObject, QRunnable, QThreadPool
 from PyQt5.QtGui import QPixmap, QPen, QColor, QPainter, QBrush, QKeySequence, QFontMetrics, QIcon
 from PyQt5.QtWidgets import (QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QAction,
                              QToolBar, QSizePolicy, QMenu, QFileDialog, QMessageBox, QToolButton)
@@ -18,6 +18,27 @@ from src.ui.widget.image_canvas.annotation_list import AnnotationList
 from src.ui.widget.image_canvas.annotation_view import AnnotationView
 
 
+class YoloModelLoaderSignals(QObject):
+    """信号容器类"""
+    finished = pyqtSignal(bool)  # 模型是否加载成功
+
+
+class YoloModelLoader(QRunnable):
+    """ YOLO模型加载线程，加载权重可能需要数秒，放到后台避免界面卡顿 """
+
+    def __init__(self, project_info: RefProjectInfo, model_path: Optional[Path] = None):
+        super().__init__()
+        self.project_info = project_info
+        self.model_path = model_path
+        self.signals = YoloModelLoaderSignals()
+        self.setAutoDelete(True)
+
+    def run(self):
+        # load_yolo_model内部捕获异常，失败时返回False
+        is_loaded = self.project_info.load_yolo_model(self.model_path)
+        self.signals.finished.emit(is_loaded)  # type: ignore
+
+
 class ImageCanvas(QGraphicsView):
     # 定义缩放常量
     MIN_SCALE = 0.3  # 最小缩放比例（30%）
@@ -28,6 +49,9 @@ class ImageCanvas(QGraphicsView):
     def __init__(self, project_info: RefProjectInfo):
         super().__init__()
         self.run_action = None
+        # 模型加载线程池，只有一个线程，多次加载按提交顺序依次执行
+        self.model_thread_pool = QThreadPool(self)
+        self.model_thread_pool.setMaxThreadCount(1)
         self.set_needs_save_annotations = False
         self.project_info = project_info
         self.last_scale_factor = None
@@ -808,10 +832,19 @@ class ImageCanvas(QGraphicsView):
             QMessageBox.information(self, "Cancelled", "Model selection cancelled.")
 
     def _load_yolo_model_async(self, model_path: Optional[Path] =None):
-        # 开始加载模型
-        self.project_info.load_yolo_model(model_path)
-        self.run_action.setEnabled(self.project_info.is_model_loaded)
-        self.run_tool_button.setEnabled(self.project_info.is_model_loaded)
+        # 开始加载模型，加载期间禁用运行按钮
+        self.run_action.setEnabled(False)
+        self.run_tool_button.setEnabled(False)
+        # 在界面线程中创建YOLOExecutor，后台线程只加载权重，避免两个线程同时初始化yolo_executor
+        _ = self.project_info.yolo_executor
+        loader = YoloModelLoader(self.project_info, model_path)
+        loader.signals.finished.connect(self._on_yolo_model_loaded)  # type: ignore
+        self.model_thread_pool.start(loader)
+
+    def _on_yolo_model_loaded(self, is_loaded: bool):
+        """模型加载完成（在界面线程中执行）"""
+        self.run_action.setEnabled(is_loaded)
+        self.run_tool_button.setEnabled(is_loaded)
 
     def delete_yolo_model(self):
         """删除已选择的YOLO模型配置"""